@@ -0,0 +1,276 @@
+"""Minimal SigV4-signed HTTPS client for the Bedrock Runtime operations we use.
+
+Only `InvokeModel` and `InvokeModelWithResponseStream` are needed, so instead of
+loading boto3/botocore (credential chain, endpoint resolution, service model JSON)
+we sign requests ourselves and decode the `vnd.amazon.eventstream` framing inline.
+"""
+
+import base64
+import functools
+import hashlib
+import hmac
+import http.client
+import os
+import socket
+import struct
+import time
+import zlib
+from typing import Iterator
+from urllib.parse import quote
+
+import orjson
+
+REGION = os.environ.get("AWS_REGION", "ap-south-1")
+HOST = f"bedrock-runtime.{REGION}.amazonaws.com"
+SERVICE = "bedrock"
+CONNECT_TIMEOUT = 1.5  # TCP connect + TLS handshake
+READ_TIMEOUT = 60
+READ_CHUNK_SIZE = 16 * 1024
+
+# Lambda injects the execution role credentials as environment variables; they
+# stay fixed for the lifetime of the execution environment.
+_ACCESS_KEY = os.environ.get("AWS_ACCESS_KEY_ID", "")
+_SECRET_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY", "")
+_SESSION_TOKEN = os.environ.get("AWS_SESSION_TOKEN", "")
+
+
+class _KeepAliveHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection with a short connect timeout and TCP keepalive enabled."""
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(READ_TIMEOUT)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+# One persistent connection is enough: a Lambda environment serves one request at a time.
+_conn = _KeepAliveHTTPSConnection(HOST, timeout=CONNECT_TIMEOUT)
+
+_PRELUDE = struct.Struct(">III")
+_UINT16 = struct.Struct(">H")
+_UINT32 = struct.Struct(">I")
+# Fixed value sizes for non-string eventstream header types (0/1 are bool true/false).
+_HEADER_VALUE_SIZES = {0: 0, 1: 0, 2: 1, 3: 2, 4: 4, 5: 8, 8: 8, 9: 16}
+
+
+class BedrockError(Exception):
+    """Raised when Bedrock rejects a request or the response stream is invalid."""
+
+
+def warm_up() -> None:
+    """Open the Bedrock connection ahead of the first request (best effort)."""
+    try:
+        _conn.connect()
+    except OSError:
+        _conn.close()
+
+
+@functools.lru_cache(maxsize=4)
+def _signing_key(secret_key: str, datestamp: str, region: str, service: str) -> bytes:
+    """Derive the SigV4 signing key (cached — it only changes once a day)."""
+    key = ("AWS4" + secret_key).encode()
+    for part in (datestamp, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+def sign_v4(
+    method: str,
+    path: str,
+    headers: dict,
+    payload: bytes,
+    amz_date: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    service: str,
+) -> str:
+    """Return the SigV4 `Authorization` header value signing every header in `headers`.
+
+    Header names must be lowercase and `amz_date` must match the `x-amz-date` header.
+    """
+    datestamp = amz_date[:8]
+    scope = f"{datestamp}/{region}/{service}/aws4_request"
+    names = sorted(headers)
+    signed_headers = ";".join(names)
+    canonical_request = "\n".join(
+        (
+            method,
+            quote(path, safe="/~"),
+            "",
+            "".join(f"{name}:{headers[name].strip()}\n" for name in names),
+            signed_headers,
+            hashlib.sha256(payload).hexdigest(),
+        )
+    )
+    string_to_sign = "\n".join(
+        (
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        )
+    )
+    signature = hmac.new(
+        _signing_key(secret_key, datestamp, region, service),
+        string_to_sign.encode(),
+        hashlib.sha256,
+    ).hexdigest()
+    return (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+
+
+def _post(path: str, body: bytes, accept_header: str) -> http.client.HTTPResponse:
+    """Send a signed POST to Bedrock Runtime and return the (unread) 200 response."""
+    if not _ACCESS_KEY or not _SECRET_KEY:
+        raise BedrockError("AWS credentials not found in environment")
+
+    amz_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    headers = {
+        accept_header: "application/json",
+        "content-type": "application/json",
+        "host": HOST,
+        "x-amz-date": amz_date,
+    }
+    if _SESSION_TOKEN:
+        headers["x-amz-security-token"] = _SESSION_TOKEN
+    headers["authorization"] = sign_v4(
+        "POST", path, headers, body, amz_date, _ACCESS_KEY, _SECRET_KEY, REGION, SERVICE
+    )
+
+    # A kept-alive connection may have been closed while the environment was
+    # frozen between invocations; reconnect and retry once in that case.
+    for attempt in range(2):
+        try:
+            _conn.request("POST", path, body=body, headers=headers)
+            resp = _conn.getresponse()
+            break
+        except ConnectionError:
+            _conn.close()
+            if attempt:
+                raise
+        except Exception:
+            # Leave the connection reusable (http.client refuses a new request
+            # while the previous one is half-sent).
+            _conn.close()
+            raise
+
+    if resp.status != 200:
+        detail = resp.read()[:500].decode("utf-8", "replace")
+        raise BedrockError(f"Bedrock returned HTTP {resp.status}: {detail}")
+    return resp
+
+
+@functools.lru_cache(maxsize=8)
+def _model_path(model_id: str, operation: str) -> str:
+    return f"/model/{quote(model_id, safe='')}/{operation}"
+
+
+def invoke(model_id: str, body: bytes) -> bytes:
+    """Call InvokeModel and return the raw JSON response body."""
+    resp = _post(_model_path(model_id, "invoke"), body, "accept")
+    try:
+        return resp.read()
+    finally:
+        _release(resp)
+
+
+def invoke_stream(model_id: str, body: bytes) -> Iterator[bytes]:
+    """Call InvokeModelWithResponseStream and yield each model chunk's JSON bytes."""
+    resp = _post(
+        _model_path(model_id, "invoke-with-response-stream"),
+        body,
+        "x-amzn-bedrock-accept",
+    )
+    try:
+        for headers, payload in iter_event_stream(resp):
+            if headers.get(":message-type") == "exception":
+                raise BedrockError(
+                    f"{headers.get(':exception-type', 'Exception')}: "
+                    f"{payload.decode('utf-8', 'replace')}"
+                )
+            if headers.get(":event-type") == "chunk":
+                yield base64.b64decode(orjson.loads(payload)["bytes"])
+    finally:
+        _release(resp)
+
+
+def _release(resp: http.client.HTTPResponse) -> None:
+    """Drop the connection if `resp` was not read to the end, so it can't be reused."""
+    if not resp.isclosed():
+        _conn.close()
+
+
+def iter_event_stream(resp) -> Iterator[tuple]:
+    """Yield `(headers, payload)` for each `vnd.amazon.eventstream` message.
+
+    Each message is a 12-byte prelude (total length, headers length, prelude CRC),
+    the headers, the payload and a trailing CRC32 of everything before it. Reads are
+    appended to a single reused `bytearray`; consumed messages are trimmed in place.
+
+    Every `chunk` event carries the same header block, so headers are only decoded
+    when the block differs from the previous message's (the yielded dict is shared
+    between such messages and must not be mutated).
+    """
+    buf = bytearray()
+    last_header_block = b""
+    headers = {}
+    while True:
+        data = resp.read1(READ_CHUNK_SIZE)
+        if not data:
+            break
+        buf += data
+        while len(buf) >= _PRELUDE.size:
+            total_length, headers_length, prelude_crc = _PRELUDE.unpack_from(buf)
+            if len(buf) < total_length:
+                break
+            headers_end = _PRELUDE.size + headers_length
+            with memoryview(buf) as view:
+                if zlib.crc32(view[:8]) != prelude_crc:
+                    raise BedrockError("Corrupt event stream prelude")
+                (message_crc,) = _UINT32.unpack_from(view, total_length - 4)
+                if zlib.crc32(view[: total_length - 4]) != message_crc:
+                    raise BedrockError("Corrupt event stream message")
+                header_block = view[_PRELUDE.size : headers_end]
+                if header_block != last_header_block:
+                    last_header_block = bytes(header_block)
+                    headers = _parse_headers(header_block)
+                del header_block
+                payload = bytes(view[headers_end : total_length - 4])
+            del buf[:total_length]
+            yield headers, payload
+
+    if buf:
+        raise BedrockError("Truncated event stream")
+
+
+def _parse_headers(data: memoryview) -> dict:
+    """Decode eventstream headers, keeping only string-typed values."""
+    headers = {}
+    pos = 0
+    end = len(data)
+    while pos < end:
+        name_length = data[pos]
+        name = bytes(data[pos + 1 : pos + 1 + name_length]).decode()
+        pos += 1 + name_length
+        value_type = data[pos]
+        pos += 1
+        if value_type in (6, 7):  # byte array / string, 2-byte length prefix
+            (value_length,) = _UINT16.unpack_from(data, pos)
+            pos += 2
+            if value_type == 7:
+                headers[name] = bytes(data[pos : pos + value_length]).decode()
+            pos += value_length
+        elif value_type in _HEADER_VALUE_SIZES:
+            pos += _HEADER_VALUE_SIZES[value_type]
+        else:
+            raise BedrockError(f"Unknown event stream header type {value_type}")
+    return headers
+
+
+# Inside Lambda, connect during INIT so the first billed request skips the
+# TCP + TLS handshake.
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    warm_up()
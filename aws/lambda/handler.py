@@ -1,52 +1,65 @@
-import json
-import boto3
+import base64
+import binascii
+import functools
 import os
 import logging
-from datetime import datetime, timezone
+import time
+from typing import Iterator
+import orjson
+import bedrock_lite
 from prompts import get_system_prompt, format_context
 
 # Setup logging
 logger = logging.getLogger()
 logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
-
-# Initialize Bedrock client (lazy — created on first use to reduce cold start if health-checked)
-_bedrock_client = None
-
-
-def get_bedrock_client():
-    global _bedrock_client
-    if _bedrock_client is None:
-        _bedrock_client = boto3.client(
-            service_name="bedrock-runtime",
-            region_name=os.environ.get("AWS_REGION", "ap-south-1"),
-        )
-    return _bedrock_client
-
+# Full tracebacks on 5xx are opt-in; walking and shipping them is costly during error storms
+_DEBUG_TRACEBACK = os.environ.get("DEBUG_TRACEBACK") == "1"
 
 MODEL_ID = os.environ.get("BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
-MAX_DIFF_LENGTH = 4000  # Limit diff content to avoid token explosion
+MAX_DIFF_LENGTH = 4000  # Limit diff content (UTF-8 bytes) to avoid token explosion
 MAX_REQUEST_BODY_SIZE = 128_000  # 128KB max request body
-VALID_REQUEST_TYPES = [
-    "explain",
-    "error",
-    "recommend",
-    "commit_suggestion",
-    "learn",
-    "review",
-    "merge_resolve",
-    "merge_strategy",
-    "agent",
-]
+VALID_REQUEST_TYPES = frozenset(
+    (
+        "explain",
+        "error",
+        "recommend",
+        "commit_suggestion",
+        "learn",
+        "review",
+        "merge_resolve",
+        "merge_strategy",
+        "agent",
+    )
+)
+
+# System prompt per request type, resolved once at import (Lambda INIT phase)
+# so request handlers only index into this dict.
+SYSTEM_PROMPTS_BY_TYPE = {
+    request_type: get_system_prompt(request_type)
+    for request_type in VALID_REQUEST_TYPES
+}
+
+# Shared by every response; API Gateway only reads it.
+_CORS_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,x-api-key",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+}
+_HEALTH_DATA = {"status": "healthy", "model": MODEL_ID, "version": "1.0.0"}
+# CORS preflight needs only the headers, so the whole response is a constant.
+_PREFLIGHT_RESPONSE = {"statusCode": 204, "headers": _CORS_HEADERS, "body": ""}
 
 
 def validate_request(body: dict) -> tuple:
     """Validate incoming request."""
     request_type = body.get("type", "explain")
 
-    if request_type not in VALID_REQUEST_TYPES:
+    # Non-str types (lists, dicts) are unhashable and can't be tested against the set
+    if not isinstance(request_type, str) or request_type not in VALID_REQUEST_TYPES:
         return (
             False,
-            f"Invalid type '{request_type}'. Must be one of: {VALID_REQUEST_TYPES}",
+            f"Invalid type '{request_type}'. Must be one of: {sorted(VALID_REQUEST_TYPES)}",
         )
 
     if request_type == "error" and not body.get("error"):
@@ -61,13 +74,42 @@ def validate_request(body: dict) -> tuple:
     return True, ""
 
 
+def declared_body_size(event: dict) -> int:
+    """Return the Content-Length header (either casing), or 0 if absent or malformed."""
+    headers = event.get("headers") or {}
+    value = headers.get("content-length") or headers.get("Content-Length") or ""
+    # isdecimal, not isdigit: int() rejects digits such as "²" that isdigit accepts
+    return int(value) if value.isdecimal() else 0
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """Cap text at `max_bytes` UTF-8 bytes, dropping any split trailing character.
+
+    At most `max_bytes` code points can fit, so only that prefix is encoded.
+    """
+    return (
+        text[:max_bytes]
+        .encode("utf-8", "replace")[:max_bytes]
+        .decode("utf-8", "ignore")
+    )
+
+
+def _iso_now() -> str:
+    """Current UTC time as ISO-8601 with millisecond precision (e.g. ...T06:19:09.449Z)."""
+    now = time.time()
+    return (
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+        + f".{int(now % 1 * 1000):03d}Z"
+    )
+
+
 def build_response(
     status_code: int, success: bool, data: dict = None, error: str = None
 ) -> dict:
     """Build standardized API response."""
     body = {
         "success": success,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _iso_now(),
         "model": MODEL_ID,
     }
 
@@ -78,13 +120,8 @@ def build_response(
 
     return {
         "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization,x-api-key",
-            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-        },
-        "body": json.dumps(body),
+        "headers": _CORS_HEADERS,
+        "body": orjson.dumps(body).decode(),
     }
 
 
@@ -94,85 +131,87 @@ def lambda_handler(event, context):
         path = event.get("path", "")
         http_method = event.get("httpMethod", "")
 
-        logger.info(f"Request: {http_method} {path}")
+        logger.info("Request: %s %s", http_method, path)
 
         # Handle health check
-        if path == "/health" or path.endswith("/health"):
-            return build_response(
-                200,
-                True,
-                data={"status": "healthy", "model": MODEL_ID, "version": "1.0.0"},
-            )
+        if path.endswith("/health"):
+            return build_response(200, True, data=_HEALTH_DATA)
 
         # Handle OPTIONS preflight
         if http_method == "OPTIONS":
-            return build_response(200, True, {"message": "OK"})
+            return _PREFLIGHT_RESPONSE
 
-        # Check request body size
+        # Check request body size before decoding or parsing anything
         raw_body = event.get("body", "")
-        if isinstance(raw_body, str) and len(raw_body) > MAX_REQUEST_BODY_SIZE:
-            logger.warning(f"Request body too large: {len(raw_body)} bytes")
+        is_base64 = isinstance(raw_body, str) and event.get("isBase64Encoded")
+        body_size = declared_body_size(event)
+        if isinstance(raw_body, str):
+            # Base64 inflates by 4/3; compare the decoded size against the limit
+            encoded_size = len(raw_body) * 3 // 4 if is_base64 else len(raw_body)
+            body_size = max(body_size, encoded_size)
+        if body_size > MAX_REQUEST_BODY_SIZE:
+            logger.warning("Request body too large: %d bytes", body_size)
             return build_response(
                 413,
                 False,
                 error=f"Request body too large (max {MAX_REQUEST_BODY_SIZE // 1024}KB)",
             )
 
-        # Parse request body
-        if isinstance(raw_body, str):
-            body = json.loads(raw_body)
+        # Parse request body (orjson reads the decoded bytes directly)
+        if is_base64:
+            body = orjson.loads(base64.b64decode(raw_body))
+        elif isinstance(raw_body, str):
+            body = orjson.loads(raw_body)
         else:
             body = raw_body if raw_body else event
 
-        logger.info(f"Request type: {body.get('type', 'explain')}")
+        logger.info("Request type: %s", body.get("type", "explain"))
 
         # Validate request
         is_valid, error_msg = validate_request(body)
         if not is_valid:
-            logger.warning(f"Invalid request: {error_msg}")
+            logger.warning("Invalid request: %s", error_msg)
             return build_response(400, False, error=error_msg)
 
         request_type = body.get("type", "explain")
-        repo_context = body.get("context", {})
-        user_query = body.get("query", "")
-        error_message = body.get("error", "")
-
-        # Build the prompt based on request type
-        if request_type == "agent":
-            response = handle_agent(repo_context, user_query)
-        elif request_type == "explain":
-            response = handle_explain(repo_context, user_query)
-        elif request_type == "error":
-            response = handle_error(error_message, repo_context)
-        elif request_type == "recommend":
-            response = handle_recommend(repo_context, user_query)
-        elif request_type == "commit_suggestion":
-            response = handle_commit_suggestion(repo_context)
-        elif request_type == "learn":
-            response = handle_learn(repo_context, user_query)
-        elif request_type == "review":
-            response = handle_review(repo_context, user_query)
-        elif request_type == "merge_resolve":
-            response = handle_merge_resolve(repo_context, user_query)
-        elif request_type == "merge_strategy":
-            response = handle_merge_strategy(repo_context, user_query)
-        else:
-            response = handle_explain(repo_context, user_query)
+        response = REQUEST_HANDLERS[request_type](body)
 
-        logger.info(f"Request processed successfully: {request_type}")
+        logger.info("Request processed successfully: %s", request_type)
         return build_response(200, True, data=response)
 
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
+    except (orjson.JSONDecodeError, binascii.Error) as e:
+        logger.error("JSON decode error: %s", e)
         return build_response(400, False, error="Invalid JSON in request body")
 
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}", exc_info=True)
+        logger.error("Error processing request: %s", e, exc_info=_DEBUG_TRACEBACK)
         return build_response(
             500, False, error="Internal server error. Please try again later."
         )
 
 
+# Bedrock request body with the constant fields pre-serialized; only max_tokens
+# and the two JSON-encoded prompt strings are filled in per call.
+_REQUEST_TEMPLATE = (
+    b'{"anthropic_version":"bedrock-2023-05-31","max_tokens":%d,"temperature":0.7,'
+    b'"system":%s,"messages":[{"role":"user","content":%s}]}'
+)
+
+_DELTA_MARKER = b'"content_block_delta"'
+
+# System prompts come from a small fixed set, so their JSON encoding is reused.
+_encode_system_prompt = functools.lru_cache(maxsize=16)(orjson.dumps)
+
+
+def build_bedrock_body(system_prompt: str, user_message: str, max_tokens: int) -> bytes:
+    """Serialize an Anthropic Messages request for Bedrock."""
+    return _REQUEST_TEMPLATE % (
+        max_tokens,
+        _encode_system_prompt(system_prompt),
+        orjson.dumps(user_message),
+    )
+
+
 def invoke_bedrock(system_prompt: str, user_message: str) -> str:
     """Invoke Amazon Bedrock with Claude model."""
     return invoke_bedrock_with_tokens(system_prompt, user_message, 1024)
@@ -187,30 +226,16 @@ def invoke_bedrock_with_tokens(
     system_prompt: str, user_message: str, max_tokens: int
 ) -> str:
     """Invoke Amazon Bedrock with Claude model (configurable max tokens)."""
-    logger.info(f"Invoking Bedrock model: {MODEL_ID}")
+    logger.info("Invoking Bedrock model: %s", MODEL_ID)
 
-    client = get_bedrock_client()
-
-    request_body = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "temperature": 0.7,
-        "system": system_prompt,
-        "messages": [{"role": "user", "content": user_message}],
-    }
-
-    response = client.invoke_model(
-        modelId=MODEL_ID,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps(request_body),
-    )
-
-    response_body = json.loads(response["body"].read())
+    request_body = build_bedrock_body(system_prompt, user_message, max_tokens)
+    response_body = orjson.loads(bedrock_lite.invoke(MODEL_ID, request_body))
 
     usage = response_body.get("usage", {})
     logger.info(
-        f"Token usage - Input: {usage.get('input_tokens', 0)}, Output: {usage.get('output_tokens', 0)}"
+        "Token usage - Input: %s, Output: %s",
+        usage.get("input_tokens", 0),
+        usage.get("output_tokens", 0),
     )
 
     return response_body["content"][0]["text"]
@@ -220,67 +245,136 @@ def invoke_bedrock_stream_with_tokens(
     system_prompt: str, user_message: str, max_tokens: int
 ) -> str:
     """Invoke Amazon Bedrock with streaming (configurable max tokens)."""
-    logger.info(f"Invoking Bedrock model (streaming): {MODEL_ID}")
+    return "".join(stream_bedrock_deltas(system_prompt, user_message, max_tokens))
 
-    client = get_bedrock_client()
 
-    request_body = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "temperature": 0.7,
-        "system": system_prompt,
-        "messages": [{"role": "user", "content": user_message}],
-    }
+def stream_bedrock_deltas(
+    system_prompt: str, user_message: str, max_tokens: int
+) -> Iterator[str]:
+    """Yield response text deltas from Bedrock as soon as each one arrives."""
+    logger.info("Invoking Bedrock model (streaming): %s", MODEL_ID)
+
+    request_body = build_bedrock_body(system_prompt, user_message, max_tokens)
+    for chunk_bytes in bedrock_lite.invoke_stream(MODEL_ID, request_body):
+        # Most events (message_start, ping, content_block_stop, ...) carry no text;
+        # only parse chunks that can be a delta.
+        if _DELTA_MARKER not in chunk_bytes:
+            continue
+        chunk = orjson.loads(chunk_bytes)
+        if chunk["type"] == "content_block_delta":
+            yield chunk["delta"].get("text", "")
 
-    response = client.invoke_model_with_response_stream(
-        modelId=MODEL_ID,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps(request_body),
-    )
 
-    full_response = ""
-    for event in response["body"]:
-        chunk = json.loads(event["chunk"]["bytes"])
-        if chunk["type"] == "content_block_delta":
-            full_response += chunk["delta"].get("text", "")
+# User message per request type, filled with str.format_map.
+_USER_TEMPLATES = {
+    "explain": """
+Repository Context:
+{context}
 
-    return full_response
+User Question: {query}
+""",
+    "error": """
+Git Error Message:
+{error}
 
+Repository Context:
+{context}
 
-def handle_explain(repo_context: dict, query: str) -> dict:
-    """Handle repository state explanation requests."""
-    system_prompt = get_system_prompt("explain")
-    context_str = format_context(repo_context)
+Please explain this error and suggest how to fix it.
+""",
+    "recommend": """
+Repository Context:
+{context}
 
-    user_message = f"""
+User wants to: {query}
+
+Recommend the safest approach.
+""",
+    "commit_suggestion": """
+Staged Files: {staged_files}
+Diff Statistics:
+- Files changed: {files_changed}
+- Insertions: {insertions}
+- Deletions: {deletions}
+{diff_preview}
+
+Respond with EXACTLY 3 commit message suggestions, each prefixed with "[SUGGESTION] ".
+No explanation, no markdown, no code blocks. Only the 3 lines.
+""",
+    "agent": """
 Repository Context:
-{context_str}
+{context}
 
-User Question: {query if query else "Explain the current repository state."}
-"""
+Conversation History:
+{query}
 
-    explanation = invoke_bedrock(system_prompt, user_message)
+Analyze the user's request and the current repository state. If you need to run git commands,
+use the [TOOL_USE] git <args> format. After each tool result, decide what to do next.
+""",
+    "learn": """
+Repository Context:
+{context}
 
-    return {"type": "explanation", "content": explanation}
+Topic to learn about: {topic}
 
+Provide a beginner-friendly explanation with practical examples.
+""",
+    "review": """
+Repository Context:
+{context}
 
-def handle_error(error_message: str, repo_context: dict) -> dict:
-    """Handle Git error translation requests."""
-    system_prompt = get_system_prompt("error")
-    context_str = format_context(repo_context)
+Files Under Review: {files}
 
-    user_message = f"""
-Git Error Message:
-{error_message}
+Diff Content:
+{diff}
 
+{notes}
+""",
+    "merge_resolve": """
 Repository Context:
-{context_str}
+{context}
 
-Please explain this error and suggest how to fix it.
-"""
+Conflicted Files: {files}
+
+Conflict Content (with markers):
+{diff}
+
+{notes}
+""",
+    "merge_strategy": """
+Repository Context:
+{context}
+
+{question}
+
+Please recommend the best merge/rebase strategy given the current repository state.
+""",
+}
 
-    explanation = invoke_bedrock(system_prompt, user_message)
+
+def build_user_message(request_type: str, **fields) -> str:
+    """Fill the user message template for a request type."""
+    return _USER_TEMPLATES[request_type].format_map(fields)
+
+
+def handle_explain(repo_context: dict, query: str) -> dict:
+    """Handle repository state explanation requests."""
+    user_message = build_user_message(
+        "explain",
+        context=format_context(repo_context),
+        query=query or "Explain the current repository state.",
+    )
+    explanation = invoke_bedrock(SYSTEM_PROMPTS_BY_TYPE["explain"], user_message)
+
+    return {"type": "explanation", "content": explanation}
+
+
+def handle_error(error_message: str, repo_context: dict) -> dict:
+    """Handle Git error translation requests."""
+    user_message = build_user_message(
+        "error", error=error_message, context=format_context(repo_context)
+    )
+    explanation = invoke_bedrock(SYSTEM_PROMPTS_BY_TYPE["error"], user_message)
 
     return {
         "type": "error_explanation",
@@ -291,152 +385,151 @@ Please explain this error and suggest how to fix it.
 
 def handle_recommend(repo_context: dict, query: str) -> dict:
     """Handle operation recommendation requests."""
-    system_prompt = get_system_prompt("recommend")
-    context_str = format_context(repo_context)
-
-    user_message = f"""
-Repository Context:
-{context_str}
-
-User wants to: {query}
-
-Recommend the safest approach.
-"""
-
-    recommendation = invoke_bedrock(system_prompt, user_message)
+    user_message = build_user_message(
+        "recommend", context=format_context(repo_context), query=query
+    )
+    recommendation = invoke_bedrock(SYSTEM_PROMPTS_BY_TYPE["recommend"], user_message)
 
     return {"type": "recommendation", "content": recommendation}
 
 
 def handle_commit_suggestion(repo_context: dict) -> dict:
     """Handle commit message suggestion requests."""
-    system_prompt = get_system_prompt("commit")
-
     staged_files = repo_context.get("staged_files", [])
     diff_stats = repo_context.get("diff_stats", {})
     diff_content = repo_context.get("diff", "")
 
-    user_message = f"""
-Staged Files: {", ".join(staged_files) if staged_files else "None specified"}
-Diff Statistics:
-- Files changed: {diff_stats.get("files_changed", len(staged_files))}
-- Insertions: {diff_stats.get("insertions", 0)}
-- Deletions: {diff_stats.get("deletions", 0)}
-{f"Diff Preview:\n{diff_content[:MAX_DIFF_LENGTH]}" if diff_content else ""}
-
-Respond with EXACTLY 3 commit message suggestions, each prefixed with "[SUGGESTION] ".
-No explanation, no markdown, no code blocks. Only the 3 lines.
-"""
-
-    suggestion = invoke_bedrock(system_prompt, user_message)
+    user_message = build_user_message(
+        "commit_suggestion",
+        staged_files=", ".join(staged_files) if staged_files else "None specified",
+        files_changed=diff_stats.get("files_changed", len(staged_files)),
+        insertions=diff_stats.get("insertions", 0),
+        deletions=diff_stats.get("deletions", 0),
+        diff_preview=(
+            "Diff Preview:\n" + truncate_utf8(diff_content, MAX_DIFF_LENGTH)
+            if diff_content
+            else ""
+        ),
+    )
+    suggestion = invoke_bedrock(
+        SYSTEM_PROMPTS_BY_TYPE["commit_suggestion"], user_message
+    )
 
     return {"type": "commit_suggestion", "content": suggestion}
 
 
 def handle_agent(repo_context: dict, user_query: str) -> dict:
     """Handle agent mode requests — AI acts as an autonomous git agent."""
-    system_prompt = get_system_prompt("agent")
-    context_str = format_context(repo_context)
-
-    user_message = f"""
-Repository Context:
-{context_str}
-
-Conversation History:
-{user_query}
-
-Analyze the user's request and the current repository state. If you need to run git commands,
-use the [TOOL_USE] git <args> format. After each tool result, decide what to do next.
-"""
-
-    suggestion = invoke_bedrock_stream(system_prompt, user_message)
+    user_message = build_user_message(
+        "agent", context=format_context(repo_context), query=user_query
+    )
+    suggestion = invoke_bedrock_stream(SYSTEM_PROMPTS_BY_TYPE["agent"], user_message)
 
     return {"type": "agent", "content": suggestion}
 
 
 def handle_learn(repo_context: dict, topic: str) -> dict:
     """Handle Git learning/tutorial requests."""
-    system_prompt = get_system_prompt("learn")
-    context_str = format_context(repo_context)
-
-    user_message = f"""
-Repository Context:
-{context_str}
-
-Topic to learn about: {topic if topic else "basic Git workflow"}
-
-Provide a beginner-friendly explanation with practical examples.
-"""
-
-    explanation = invoke_bedrock(system_prompt, user_message)
+    user_message = build_user_message(
+        "learn",
+        context=format_context(repo_context),
+        topic=topic or "basic Git workflow",
+    )
+    explanation = invoke_bedrock(SYSTEM_PROMPTS_BY_TYPE["learn"], user_message)
 
     return {"type": "learning", "topic": topic, "content": explanation}
 
 
 def handle_review(repo_context: dict, query: str) -> dict:
     """Handle code diff review requests."""
-    system_prompt = get_system_prompt("review")
-    context_str = format_context(repo_context)
-
     diff_content = repo_context.get("diff", "")
     staged_files = repo_context.get("staged_files", [])
 
-    user_message = f"""
-Repository Context:
-{context_str}
-
-Files Under Review: {", ".join(staged_files) if staged_files else "Unknown"}
-
-Diff Content:
-{diff_content[:MAX_DIFF_LENGTH] if diff_content else "No diff provided"}
-
-{f"Reviewer Notes: {query}" if query else "Review this diff for issues and improvements."}
-"""
-
-    review = invoke_bedrock_stream(system_prompt, user_message)
+    user_message = build_user_message(
+        "review",
+        context=format_context(repo_context),
+        files=", ".join(staged_files) if staged_files else "Unknown",
+        diff=(
+            truncate_utf8(diff_content, MAX_DIFF_LENGTH)
+            if diff_content
+            else "No diff provided"
+        ),
+        notes=(
+            f"Reviewer Notes: {query}"
+            if query
+            else "Review this diff for issues and improvements."
+        ),
+    )
+    review = invoke_bedrock_stream(SYSTEM_PROMPTS_BY_TYPE["review"], user_message)
 
     return {"type": "review", "content": review}
 
 
 def handle_merge_resolve(repo_context: dict, query: str) -> dict:
     """Handle merge conflict resolution requests."""
-    system_prompt = get_system_prompt("merge_resolve")
-    context_str = format_context(repo_context)
-
     conflict_diff = repo_context.get("conflict_diff", "")
     conflict_files = repo_context.get("conflict_files", [])
 
-    user_message = f"""
-Repository Context:
-{context_str}
-
-Conflicted Files: {", ".join(conflict_files) if conflict_files else "Unknown"}
-
-Conflict Content (with markers):
-{conflict_diff[:MAX_DIFF_LENGTH] if conflict_diff else "No conflict content provided"}
-
-{f"Developer Notes: {query}" if query else "Analyze this merge conflict and recommend the best resolution."}
-"""
-
-    resolution = invoke_bedrock_stream(system_prompt, user_message)
+    user_message = build_user_message(
+        "merge_resolve",
+        context=format_context(repo_context),
+        files=", ".join(conflict_files) if conflict_files else "Unknown",
+        diff=(
+            truncate_utf8(conflict_diff, MAX_DIFF_LENGTH)
+            if conflict_diff
+            else "No conflict content provided"
+        ),
+        notes=(
+            f"Developer Notes: {query}"
+            if query
+            else "Analyze this merge conflict and recommend the best resolution."
+        ),
+    )
+    resolution = invoke_bedrock_stream(
+        SYSTEM_PROMPTS_BY_TYPE["merge_resolve"], user_message
+    )
 
     return {"type": "merge_resolution", "content": resolution}
 
 
 def handle_merge_strategy(repo_context: dict, query: str) -> dict:
     """Handle merge strategy recommendation requests."""
-    system_prompt = get_system_prompt("merge_strategy")
-    context_str = format_context(repo_context)
-
-    user_message = f"""
-Repository Context:
-{context_str}
-
-{f"Developer Question: {query}" if query else "What is the safest strategy to integrate these branches?"}
+    user_message = build_user_message(
+        "merge_strategy",
+        context=format_context(repo_context),
+        question=(
+            f"Developer Question: {query}"
+            if query
+            else "What is the safest strategy to integrate these branches?"
+        ),
+    )
+    recommendation = invoke_bedrock(
+        SYSTEM_PROMPTS_BY_TYPE["merge_strategy"], user_message
+    )
 
-Please recommend the best merge/rebase strategy given the current repository state.
-"""
+    return {"type": "merge_strategy", "content": recommendation}
 
-    recommendation = invoke_bedrock(system_prompt, user_message)
 
-    return {"type": "merge_strategy", "content": recommendation}
+# Request type -> handler taking the parsed request body. validate_request has
+# already rejected unknown types, so lambda_handler can index directly.
+REQUEST_HANDLERS = {
+    "explain": lambda body: handle_explain(
+        body.get("context", {}), body.get("query", "")
+    ),
+    "error": lambda body: handle_error(body.get("error", ""), body.get("context", {})),
+    "recommend": lambda body: handle_recommend(
+        body.get("context", {}), body.get("query", "")
+    ),
+    "commit_suggestion": lambda body: handle_commit_suggestion(body.get("context", {})),
+    "learn": lambda body: handle_learn(body.get("context", {}), body.get("query", "")),
+    "review": lambda body: handle_review(
+        body.get("context", {}), body.get("query", "")
+    ),
+    "merge_resolve": lambda body: handle_merge_resolve(
+        body.get("context", {}), body.get("query", "")
+    ),
+    "merge_strategy": lambda body: handle_merge_strategy(
+        body.get("context", {}), body.get("query", "")
+    ),
+    "agent": lambda body: handle_agent(body.get("context", {}), body.get("query", "")),
+}
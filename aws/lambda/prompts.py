@@ -1,5 +1,7 @@
 """System prompts for different AI Mentor modes."""
 
+from itertools import islice
+
 SYSTEM_PROMPTS = {
     "explain": """You are a friendly Git mentor helping developers understand their repository state.
 
@@ -156,62 +158,55 @@ FOLLOW-UP:
 Keep responses under 300 words.""",
 }
 
+# The commit_suggestion request type shares the "commit" prompt (same string object).
+SYSTEM_PROMPTS["commit_suggestion"] = SYSTEM_PROMPTS["commit"]
+
+_DEFAULT_PROMPT = SYSTEM_PROMPTS["explain"]
+
 
 def get_system_prompt(prompt_type: str) -> str:
     """Get the system prompt for a given request type."""
-    return SYSTEM_PROMPTS.get(prompt_type, SYSTEM_PROMPTS["explain"])
+    return SYSTEM_PROMPTS.get(prompt_type, _DEFAULT_PROMPT)
+
+
+def _list_line(label: str, limit: int):
+    """Formatter for a list field: count plus the first `limit` entries."""
+    return lambda items: f"{label} ({len(items)}): {', '.join(islice(items, limit))}"
+
+
+# (context key, formatter) pairs, in output order, for lines emitted when the value
+# is truthy. Ahead/behind is compound and is emitted between the two tables.
+_CONTEXT_FIELDS_HEAD = (
+    ("repo_path", "Repository Path: {}".format),
+    ("branch", "Current Branch: {}".format),
+    ("upstream", "Upstream: {}".format),
+)
+_CONTEXT_FIELDS_TAIL = (
+    ("staged_files", _list_line("Staged Files", 5)),
+    ("unstaged_files", _list_line("Unstaged Files", 5)),
+    ("has_conflicts", lambda _: "⚠️ MERGE CONFLICTS PRESENT"),
+    ("conflict_files", _list_line("Conflicted Files", 10)),
+    ("conflict_diff", lambda diff: f"Conflict Content:\n{diff[:4000]}"),
+    ("merge_type", "Merge Type: {}".format),
+    ("detached_head", lambda _: "⚠️ DETACHED HEAD STATE"),
+    (
+        "recent_commits",
+        lambda commits: "Recent Commits:"
+        + "".join(f"\n  - {commit}" for commit in islice(commits, 3)),
+    ),
+)
 
 
 def format_context(repo_context: dict) -> str:
     """Format repository context into a readable string."""
-    lines = []
-
-    if repo_context.get("repo_path"):
-        lines.append(f"Repository Path: {repo_context['repo_path']}")
+    get = repo_context.get
+    lines = [fmt(value) for key, fmt in _CONTEXT_FIELDS_HEAD if (value := get(key))]
 
-    if repo_context.get("branch"):
-        lines.append(f"Current Branch: {repo_context['branch']}")
-
-    if repo_context.get("upstream"):
-        lines.append(f"Upstream: {repo_context['upstream']}")
-
-    ahead = repo_context.get("ahead", 0)
-    behind = repo_context.get("behind", 0)
+    ahead = get("ahead", 0)
+    behind = get("behind", 0)
     if ahead or behind:
         lines.append(f"Ahead/Behind: +{ahead}/-{behind}")
 
-    if repo_context.get("staged_files"):
-        lines.append(
-            f"Staged Files ({len(repo_context['staged_files'])}): {', '.join(repo_context['staged_files'][:5])}"
-        )
-
-    if repo_context.get("unstaged_files"):
-        lines.append(
-            f"Unstaged Files ({len(repo_context['unstaged_files'])}): {', '.join(repo_context['unstaged_files'][:5])}"
-        )
-
-    if repo_context.get("has_conflicts"):
-        lines.append("⚠️ MERGE CONFLICTS PRESENT")
-
-    if repo_context.get("conflict_files"):
-        conflict_files = repo_context["conflict_files"]
-        lines.append(
-            f"Conflicted Files ({len(conflict_files)}): {', '.join(conflict_files[:10])}"
-        )
-
-    if repo_context.get("conflict_diff"):
-        conflict_diff = repo_context["conflict_diff"][:4000]
-        lines.append(f"Conflict Content:\n{conflict_diff}")
-
-    if repo_context.get("merge_type"):
-        lines.append(f"Merge Type: {repo_context['merge_type']}")
-
-    if repo_context.get("detached_head"):
-        lines.append("⚠️ DETACHED HEAD STATE")
-
-    if repo_context.get("recent_commits"):
-        lines.append("Recent Commits:")
-        for commit in repo_context["recent_commits"][:3]:
-            lines.append(f"  - {commit}")
+    lines.extend(fmt(value) for key, fmt in _CONTEXT_FIELDS_TAIL if (value := get(key)))
 
-    return "\n".join(lines) if lines else "No context provided"
+    return "\n".join(lines) or "No context provided"
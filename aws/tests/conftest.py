@@ -0,0 +1,107 @@
+"""Shared fixtures for the zit AI Mentor Lambda tests."""
+
+from collections import ChainMap
+from types import MappingProxyType
+import orjson
+import pytest
+
+# The lambda directory is on sys.path via `pythonpath` in pytest.ini
+import bedrock_lite
+import handler
+
+
+class OfflineConnection:
+    """Replaces bedrock_lite's HTTPS connection so no test can reach AWS."""
+
+    def connect(self):
+        raise OSError("network access is disabled in tests")
+
+    def request(self, *args, **kwargs):
+        self.connect()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="session", autouse=True)
+def offline_bedrock():
+    """Dummy credentials and no network for any Bedrock call a test forgets to stub.
+
+    The credentials make an unstubbed call get as far as signing (rather than failing
+    early on a developer machine without AWS credentials, or reaching Bedrock on one
+    with them); the request itself then fails in-process without opening a socket.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(bedrock_lite, "_ACCESS_KEY", "testing")
+        mp.setattr(bedrock_lite, "_SECRET_KEY", "testing")
+        mp.setattr(bedrock_lite, "_SESSION_TOKEN", "")
+        mp.setattr(bedrock_lite, "_conn", OfflineConnection())
+        yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_handler(offline_bedrock):
+    """Invoke the handler once (GET /health) so first-call setup isn't billed to a test."""
+    handler.lambda_handler({"path": "/health", "httpMethod": "GET"}, None)
+
+
+# Read-only so no test can leak a mutation into another test's events
+_BASE_EVENT = MappingProxyType({"path": "/mentor", "httpMethod": "POST"})
+
+
+@pytest.fixture(scope="session")
+def make_event():
+    """Factory for POST /mentor events layered over a shared read-only base.
+
+    `payload` is JSON-encoded into the body; any other event field, including a raw
+    `body`, can be given as a keyword override.
+    """
+
+    def _make_event(payload: dict = None, **overrides) -> ChainMap:
+        if payload is not None:
+            overrides["body"] = orjson.dumps(payload).decode()
+        return ChainMap(overrides, _BASE_EVENT)
+
+    return _make_event
+
+
+class BedrockStub:
+    """Minimal callable stand-in for `invoke_bedrock` (MagicMock is far heavier).
+
+    Mirrors the MagicMock attributes the tests use: `return_value`, `side_effect`
+    (an exception to raise) and the recorded `calls`.
+    """
+
+    def __init__(self):
+        self.return_value = None
+        self.side_effect = None
+        self.calls = []
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        if self.side_effect is not None:
+            raise self.side_effect
+        return self.return_value
+
+
+@pytest.fixture
+def bedrock_mock(monkeypatch):
+    """Stand-in for `handler.invoke_bedrock`; set `return_value` or `side_effect`."""
+    stub = BedrockStub()
+    monkeypatch.setattr(handler, "invoke_bedrock", stub)
+    return stub
+
+
+@pytest.fixture
+def parsed():
+    """Decode a Lambda response's JSON body, parsing each response at most once."""
+    bodies = {}
+
+    def _parsed(resp: dict) -> dict:
+        key = id(resp)
+        if key not in bodies:
+            # Hold a reference to resp so its id can't be reused within the test
+            bodies[key] = (resp, orjson.loads(resp["body"]))
+        return bodies[key][1]
+
+    return _parsed
@@ -0,0 +1,106 @@
+"""Tests for the lightweight Bedrock Runtime client."""
+
+import base64
+import io
+import struct
+import zlib
+import orjson
+import pytest
+
+from bedrock_lite import BedrockError, invoke, iter_event_stream, sign_v4
+
+SECRET = "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY"
+
+
+def encode_message(headers: dict, payload: bytes) -> bytes:
+    """Encode a vnd.amazon.eventstream message with string headers."""
+    header_bytes = b""
+    for name, value in headers.items():
+        value = value.encode()
+        header_bytes += bytes([len(name)]) + name.encode() + b"\x07"
+        header_bytes += struct.pack(">H", len(value)) + value
+    total = 12 + len(header_bytes) + len(payload) + 4
+    prelude = struct.pack(">II", total, len(header_bytes))
+    prelude += struct.pack(">I", zlib.crc32(prelude))
+    message = prelude + header_bytes + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+def chunk_message(chunk: dict) -> bytes:
+    payload = orjson.dumps({"bytes": base64.b64encode(orjson.dumps(chunk)).decode()})
+    return encode_message({":event-type": "chunk", ":message-type": "event"}, payload)
+
+
+class FakeResponse(io.BytesIO):
+    """Serves the stream in small reads to exercise frame reassembly."""
+
+    def read1(self, size=-1):
+        return super().read1(7)
+
+
+# ─── SigV4 Tests ────────────────────────────────────────────────
+
+class TestSignV4:
+    def test_aws_post_vanilla_vector(self):
+        auth = sign_v4(
+            "POST", "/",
+            {"host": "example.amazonaws.com", "x-amz-date": "20150830T123600Z"},
+            b"", "20150830T123600Z", "AKIDEXAMPLE", SECRET, "us-east-1", "service",
+        )
+        assert auth == (
+            "AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/20150830/us-east-1/service/aws4_request, "
+            "SignedHeaders=host;x-amz-date, "
+            "Signature=5da7c1a2acd57cee7505fc6676e4e544621c30862966e37dddb68e92efbe5d6b"
+        )
+
+    def test_signed_headers_are_sorted(self):
+        auth = sign_v4(
+            "POST", "/model/m%3A0/invoke",
+            {"x-amz-date": "20260101T000000Z", "host": "h", "content-type": "application/json"},
+            b"{}", "20260101T000000Z", "AKID", SECRET, "ap-south-1", "bedrock",
+        )
+        assert "Credential=AKID/20260101/ap-south-1/bedrock/aws4_request" in auth
+        assert "SignedHeaders=content-type;host;x-amz-date" in auth
+
+
+# ─── Event Stream Tests ─────────────────────────────────────────
+
+class TestEventStream:
+    def test_decodes_split_messages(self):
+        stream = chunk_message({"type": "content_block_delta", "delta": {"text": "Hi"}})
+        stream += chunk_message({"type": "message_stop"})
+        messages = list(iter_event_stream(FakeResponse(stream)))
+        assert len(messages) == 2
+        headers, payload = messages[0]
+        assert headers[":event-type"] == "chunk"
+        chunk = orjson.loads(base64.b64decode(orjson.loads(payload)["bytes"]))
+        assert chunk["delta"]["text"] == "Hi"
+
+    def test_header_changes_are_decoded(self):
+        stream = chunk_message({"type": "ping"})
+        stream += encode_message(
+            {":exception-type": "throttlingException", ":message-type": "exception"},
+            b'{"message":"slow down"}',
+        )
+        messages = list(iter_event_stream(FakeResponse(stream)))
+        assert messages[0][0][":message-type"] == "event"
+        assert messages[1][0][":exception-type"] == "throttlingException"
+
+    def test_corrupt_message_raises(self):
+        stream = bytearray(chunk_message({"type": "ping"}))
+        stream[-1] ^= 0xFF
+        with pytest.raises(BedrockError):
+            list(iter_event_stream(FakeResponse(bytes(stream))))
+
+    def test_truncated_stream_raises(self):
+        stream = chunk_message({"type": "ping"})[:-3]
+        with pytest.raises(BedrockError):
+            list(iter_event_stream(FakeResponse(stream)))
+
+
+# ─── Offline Guard Tests ────────────────────────────────────────
+
+class TestOffline:
+    def test_unstubbed_invoke_never_reaches_network(self):
+        with pytest.raises(OSError, match="disabled in tests"):
+            invoke("anthropic.claude-3-haiku-20240307-v1:0", b"{}")
@@ -1,241 +1,257 @@
 """Tests for zit AI Mentor Lambda handler."""
 
-import json
-import pytest
-from unittest.mock import patch, MagicMock
-
-# Import handler from lambda directory
+import base64
+import re
+import subprocess
 import sys
 import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda'))
-
-from handler import (
-    lambda_handler,
-    validate_request,
-    build_response,
-    handle_commit_suggestion,
-    VALID_REQUEST_TYPES,
+import orjson
+import pytest
+
+import handler
+from prompts import SYSTEM_PROMPTS, get_system_prompt, format_context
+
+# Request/stream bodies shared by several tests, encoded once at import
+_BODY_EXPLAIN = orjson.dumps({"type": "explain"})
+_STREAM_CHUNKS = (
+    orjson.dumps({"type": "message_start"}),
+    orjson.dumps({"type": "content_block_delta", "delta": {"text": "Keep "}}),
+    orjson.dumps({"type": "content_block_delta", "delta": {"text": "HEAD"}}),
+    orjson.dumps({"type": "message_stop"}),
 )
-from prompts import get_system_prompt, format_context
 
 
 # ─── Validation Tests ───────────────────────────────────────────
 
-class TestValidateRequest:
-    def test_valid_explain_request(self):
-        ok, msg = validate_request({"type": "explain"})
-        assert ok is True
-        assert msg == ""
-
-    def test_valid_commit_suggestion(self):
-        ok, msg = validate_request({"type": "commit_suggestion"})
-        assert ok is True
+_VALIDATION_CASES = (
+    pytest.param({"type": "explain"}, True, "", id="explain"),
+    pytest.param({"type": "commit_suggestion"}, True, "", id="commit_suggestion"),
+    pytest.param({"type": "invalid_type"}, False, "Invalid type", id="invalid_type"),
+    pytest.param({"type": []}, False, "Invalid type", id="unhashable_type"),
+    pytest.param({"type": "error"}, False, "'error' field", id="error_without_error_field"),
+    pytest.param({"type": "error", "error": "fatal: not a repo"}, True, "", id="error_with_error_field"),
+    pytest.param({"type": "recommend"}, False, "'query' field", id="recommend_without_query"),
+    pytest.param({"type": "recommend", "query": "undo last commit"}, True, "", id="recommend_with_query"),
+    pytest.param({}, True, "", id="default_type_is_explain"),
+)
 
-    def test_invalid_type(self):
-        ok, msg = validate_request({"type": "invalid_type"})
-        assert ok is False
-        assert "Invalid type" in msg
 
-    def test_error_type_without_error_field(self):
-        ok, msg = validate_request({"type": "error"})
-        assert ok is False
-        assert "'error' field" in msg
+class TestValidateRequest:
+    @pytest.mark.parametrize("payload,expected_ok,expected_msg", _VALIDATION_CASES)
+    def test_validate_request(self, payload, expected_ok, expected_msg):
+        ok, msg = handler.validate_request(payload)
+        assert ok is expected_ok
+        # Valid requests carry no message; invalid ones must explain the problem
+        assert (msg == "") if expected_ok else (expected_msg in msg)
 
-    def test_error_type_with_error_field(self):
-        ok, msg = validate_request({"type": "error", "error": "fatal: not a repo"})
-        assert ok is True
 
-    def test_recommend_type_without_query(self):
-        ok, msg = validate_request({"type": "recommend"})
-        assert ok is False
-        assert "'query' field" in msg
+# ─── Truncation Tests ───────────────────────────────────────────
 
-    def test_recommend_type_with_query(self):
-        ok, msg = validate_request({"type": "recommend", "query": "undo last commit"})
-        assert ok is True
+class TestTruncateUtf8:
+    def test_short_text_unchanged(self):
+        assert handler.truncate_utf8("+fn main() {}", 4000) == "+fn main() {}"
 
-    def test_default_type_is_explain(self):
-        ok, msg = validate_request({})
-        assert ok is True
+    def test_multibyte_text_capped_by_bytes(self):
+        result = handler.truncate_utf8("é" * 10, 5)
+        assert result == "éé"
+        assert len(result.encode("utf-8")) <= 5
 
 
 # ─── Response Builder Tests ─────────────────────────────────────
 
 class TestBuildResponse:
-    def test_success_response(self):
-        resp = build_response(200, True, data={"content": "hello"})
-        assert resp["statusCode"] == 200
-        body = json.loads(resp["body"])
-        assert body["success"] is True
-        assert body["response"]["content"] == "hello"
-        assert "timestamp" in body
-        assert "model" in body
-
-    def test_error_response(self):
-        resp = build_response(400, False, error="bad request")
-        body = json.loads(resp["body"])
-        assert body["success"] is False
-        assert body["error"] == "bad request"
-
-    def test_cors_headers(self):
-        resp = build_response(200, True)
+    @pytest.mark.parametrize("status,success,kwargs,expect", [
+        (200, True, {"data": {"content": "hello"}}, {"success": True, "response": {"content": "hello"}}),
+        (400, False, {"error": "bad request"}, {"success": False, "error": "bad request"}),
+    ], ids=["success", "error"])
+    def test_build_response(self, parsed, status, success, kwargs, expect):
+        resp = handler.build_response(status, success, **kwargs)
+        assert resp["statusCode"] == status
         assert resp["headers"]["Access-Control-Allow-Origin"] == "*"
         assert "Content-Type" in resp["headers"]
+        body = parsed(resp)
+        assert expect.items() <= body.items()
+        assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z", body["timestamp"])
+        assert "model" in body
 
 
 # ─── Health Check Tests ─────────────────────────────────────────
 
 class TestHealthCheck:
-    def test_health_endpoint(self):
+    def test_health_endpoint(self, parsed):
         event = {"path": "/health", "httpMethod": "GET"}
-        resp = lambda_handler(event, None)
+        resp = handler.lambda_handler(event, None)
         assert resp["statusCode"] == 200
-        body = json.loads(resp["body"])
+        body = parsed(resp)
         assert body["response"]["status"] == "healthy"
 
     def test_health_endpoint_with_prefix(self):
         event = {"path": "/dev/health", "httpMethod": "GET"}
-        resp = lambda_handler(event, None)
+        resp = handler.lambda_handler(event, None)
         assert resp["statusCode"] == 200
 
     def test_options_preflight(self):
         event = {"path": "/mentor", "httpMethod": "OPTIONS"}
-        resp = lambda_handler(event, None)
-        assert resp["statusCode"] == 200
+        resp = handler.lambda_handler(event, None)
+        assert resp["statusCode"] == 204
+        assert resp["body"] == ""
+        assert resp["headers"]["Access-Control-Allow-Methods"] == "GET,POST,OPTIONS"
 
 
 # ─── Lambda Handler Tests ───────────────────────────────────────
 
 class TestLambdaHandler:
-    def test_invalid_json_body(self):
-        event = {"path": "/mentor", "httpMethod": "POST", "body": "not json"}
-        resp = lambda_handler(event, None)
+    def test_invalid_json_body(self, make_event, parsed):
+        event = make_event(body="not json")
+        resp = handler.lambda_handler(event, None)
         assert resp["statusCode"] == 400
-        body = json.loads(resp["body"])
+        body = parsed(resp)
         assert "Invalid JSON" in body["error"]
 
-    def test_invalid_request_type(self):
-        event = {
-            "path": "/mentor",
-            "httpMethod": "POST",
-            "body": json.dumps({"type": "hack"})
-        }
-        resp = lambda_handler(event, None)
-        assert resp["statusCode"] == 400
+    def test_declared_content_length_too_large(self, make_event):
+        event = make_event(headers={"Content-Length": "500000"}, body=_BODY_EXPLAIN.decode())
+        resp = handler.lambda_handler(event, None)
+        assert resp["statusCode"] == 413
 
-    @patch("handler.invoke_bedrock")
-    def test_explain_request(self, mock_bedrock):
-        mock_bedrock.return_value = "Your repo is clean."
-        event = {
-            "path": "/mentor",
-            "httpMethod": "POST",
-            "body": json.dumps({
-                "type": "explain",
-                "context": {"branch": "main"},
-                "query": "What is happening?"
-            })
-        }
-        resp = lambda_handler(event, None)
+    def test_malformed_content_length_is_ignored(self, make_event, bedrock_mock):
+        bedrock_mock.return_value = "ok"
+        event = make_event(headers={"Content-Length": "²"}, body=_BODY_EXPLAIN.decode())
+        resp = handler.lambda_handler(event, None)
         assert resp["statusCode"] == 200
-        body = json.loads(resp["body"])
-        assert body["success"] is True
-        assert body["response"]["type"] == "explanation"
-        assert body["response"]["content"] == "Your repo is clean."
-
-    @patch("handler.invoke_bedrock")
-    def test_commit_suggestion_request(self, mock_bedrock):
-        mock_bedrock.return_value = "feat: add user authentication"
-        event = {
-            "path": "/mentor",
-            "httpMethod": "POST",
-            "body": json.dumps({
+
+    def test_base64_encoded_body(self, make_event, bedrock_mock):
+        bedrock_mock.return_value = "ok"
+        event = make_event(isBase64Encoded=True, body=base64.b64encode(_BODY_EXPLAIN).decode())
+        resp = handler.lambda_handler(event, None)
+        assert resp["statusCode"] == 200
+
+    def test_validation_failure_smoke(self, make_event, parsed):
+        """End-to-end 400 path; the individual rules are covered by TestValidateRequest."""
+        payload = {"type": "hack"}
+        resp = handler.lambda_handler(make_event(payload), None)
+        assert resp["statusCode"] == 400
+        assert parsed(resp)["error"] == handler.validate_request(payload)[1]
+
+    @pytest.mark.parametrize("payload,ret,expected", [
+        (
+            {"type": "explain", "context": {"branch": "main"}, "query": "What is happening?"},
+            "Your repo is clean.",
+            {"type": "explanation"},
+        ),
+        (
+            {
                 "type": "commit_suggestion",
                 "context": {
                     "staged_files": ["src/auth.rs"],
                     "diff_stats": {"files_changed": 1, "insertions": 50, "deletions": 0},
                     "diff": "+pub fn login() {\n+    // OAuth flow\n+}"
                 }
-            })
-        }
-        resp = lambda_handler(event, None)
-        assert resp["statusCode"] == 200
-        body = json.loads(resp["body"])
-        assert body["response"]["type"] == "commit_suggestion"
-        assert "feat:" in body["response"]["content"]
-
-    @patch("handler.invoke_bedrock")
-    def test_error_request(self, mock_bedrock):
-        mock_bedrock.return_value = "You have uncommitted changes."
-        event = {
-            "path": "/mentor",
-            "httpMethod": "POST",
-            "body": json.dumps({
+            },
+            "feat: add user authentication",
+            {"type": "commit_suggestion"},
+        ),
+        (
+            {
                 "type": "error",
                 "error": "error: Your local changes would be overwritten",
                 "context": {"branch": "main"}
-            })
-        }
-        resp = lambda_handler(event, None)
+            },
+            "You have uncommitted changes.",
+            {
+                "type": "error_explanation",
+                "original_error": "error: Your local changes would be overwritten"
+            },
+        ),
+        (
+            {"type": "learn", "query": "what are branches?"},
+            "A branch is like a parallel universe.",
+            {"type": "learning"},
+        ),
+    ], ids=["explain", "commit_suggestion", "error", "learn"])
+    def test_mentor_request(self, make_event, bedrock_mock, parsed, payload, ret, expected):
+        bedrock_mock.return_value = ret
+        resp = handler.lambda_handler(make_event(payload), None)
         assert resp["statusCode"] == 200
-        body = json.loads(resp["body"])
-        assert body["response"]["type"] == "error_explanation"
-        assert body["response"]["original_error"] == "error: Your local changes would be overwritten"
-
-    @patch("handler.invoke_bedrock")
-    def test_learn_request(self, mock_bedrock):
-        mock_bedrock.return_value = "A branch is like a parallel universe."
-        event = {
-            "path": "/mentor",
-            "httpMethod": "POST",
-            "body": json.dumps({
-                "type": "learn",
-                "query": "what are branches?"
-            })
-        }
-        resp = lambda_handler(event, None)
-        assert resp["statusCode"] == 200
-        body = json.loads(resp["body"])
-        assert body["response"]["type"] == "learning"
-
-    @patch("handler.invoke_bedrock", side_effect=Exception("Bedrock timeout"))
-    def test_bedrock_failure(self, mock_bedrock):
-        event = {
-            "path": "/mentor",
-            "httpMethod": "POST",
-            "body": json.dumps({"type": "explain", "context": {}})
-        }
-        resp = lambda_handler(event, None)
+        body = parsed(resp)
+        assert body["success"] is True
+        assert body["response"]["content"] == ret
+        for key, value in expected.items():
+            assert body["response"][key] == value
+
+    def test_bedrock_failure(self, make_event, bedrock_mock, parsed):
+        bedrock_mock.side_effect = Exception("Bedrock timeout")
+        event = make_event({"type": "explain", "context": {}})
+        resp = handler.lambda_handler(event, None)
         assert resp["statusCode"] == 500
-        body = json.loads(resp["body"])
+        body = parsed(resp)
         assert body["success"] is False
         assert "Internal server error" in body["error"]
 
-    def test_dict_body_passthrough(self):
+    def test_dict_body_passthrough(self, make_event, bedrock_mock):
         """Test when API Gateway passes body as dict (test invocation)."""
-        with patch("handler.invoke_bedrock", return_value="ok"):
-            event = {
-                "path": "/mentor",
-                "httpMethod": "POST",
-                "body": {"type": "explain", "context": {}}
-            }
-            resp = lambda_handler(event, None)
-            assert resp["statusCode"] == 200
+        bedrock_mock.return_value = "ok"
+        event = make_event(body={"type": "explain", "context": {}})
+        resp = handler.lambda_handler(event, None)
+        assert resp["statusCode"] == 200
+
+
+# ─── Bedrock Request Tests ──────────────────────────────────────
+
+class TestBedrockBody:
+    def test_matches_messages_api_shape(self):
+        body = orjson.loads(handler.build_bedrock_body("Be brief.", 'Say "hi"\n', 1024))
+        assert body == {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1024,
+            "temperature": 0.7,
+            "system": "Be brief.",
+            "messages": [{"role": "user", "content": 'Say "hi"\n'}],
+        }
+
+
+# ─── Streaming Tests ────────────────────────────────────────────
+
+class TestStreaming:
+    def test_deltas_yielded_in_order(self, monkeypatch):
+        monkeypatch.setattr(handler.bedrock_lite, "invoke_stream", lambda *_: iter(_STREAM_CHUNKS))
+        deltas = handler.stream_bedrock_deltas("system", "user", 256)
+        assert next(deltas) == "Keep "
+        assert list(deltas) == ["HEAD"]
+
+
+# ─── Cold Start Tests ───────────────────────────────────────────
+
+class TestColdStart:
+    def test_handler_import_does_not_load_boto3(self):
+        lambda_dir = os.path.join(os.path.dirname(__file__), '..', 'lambda')
+        code = "import sys, handler; print([m for m in ('boto3', 'botocore') if m in sys.modules])"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=lambda_dir, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "[]"
 
 
 # ─── Prompt Tests ───────────────────────────────────────────────
 
 class TestPrompts:
-    def test_all_prompt_types_exist(self):
-        for ptype in VALID_REQUEST_TYPES:
-            prompt_key = "commit" if ptype == "commit_suggestion" else ptype
-            prompt = get_system_prompt(prompt_key)
-            assert len(prompt) > 50, f"Prompt for '{ptype}' is too short"
+    @pytest.mark.parametrize("ptype", sorted(handler.VALID_REQUEST_TYPES))
+    def test_all_prompt_types_exist(self, ptype):
+        # commit_suggestion resolves to the commit prompt via its SYSTEM_PROMPTS alias
+        assert len(get_system_prompt(ptype)) > 50, f"Prompt for '{ptype}' is too short"
+
+    def test_no_request_type_falls_back(self):
+        # agent has no prompt of its own and runs on the default (explain) prompt
+        missing = handler.VALID_REQUEST_TYPES - SYSTEM_PROMPTS.keys() - {"agent"}
+        assert not missing, f"No dedicated prompt for: {sorted(missing)}"
 
     def test_unknown_prompt_falls_back(self):
         prompt = get_system_prompt("nonexistent")
         default_prompt = get_system_prompt("explain")
         assert prompt == default_prompt
 
+    def test_commit_suggestion_uses_commit_prompt(self):
+        assert get_system_prompt("commit_suggestion") is get_system_prompt("commit")
+
     def test_format_context_empty(self):
         result = format_context({})
         assert result == "No context provided"
@@ -253,15 +269,28 @@ class TestPrompts:
             "recent_commits": ["abc1234 fix: typo", "def5678 feat: login"]
         }
         result = format_context(ctx)
+        expected = ("main", "origin/main", "+2/-1", "file1.rs", "MERGE CONFLICTS", "DETACHED HEAD", "fix: typo")
+        missing = [token for token in expected if token not in result]
+        assert not missing, f"Missing from context: {missing}"
+
+    def test_format_context_reflects_changed_context(self):
+        ctx = {"branch": "main", "staged_files": ["a.rs"]}
+        assert "Staged Files (1): a.rs" in format_context(ctx)
+        ctx["staged_files"].append("b.rs")
+        assert "Staged Files (2): a.rs, b.rs" in format_context(ctx)
+
+    def test_format_context_equal_values_of_different_types(self):
+        assert "+1/-0" in format_context({"ahead": 1})
+        assert "+True/-0" in format_context({"ahead": True})
+        assert "Current Branch: 1.0" in format_context({"branch": 1.0})
+        assert "Current Branch: 1\n" in format_context({"branch": 1, "ahead": 2})
+
+    def test_format_context_unhashable_values(self):
+        result = format_context({"branch": "main", "recent_commits": [{"sha": "abc"}]})
         assert "main" in result
-        assert "origin/main" in result
-        assert "+2/-1" in result
-        assert "file1.rs" in result
-        assert "MERGE CONFLICTS" in result
-        assert "DETACHED HEAD" in result
-        assert "fix: typo" in result
 
     def test_format_context_partial(self):
         result = format_context({"branch": "develop"})
         assert "develop" in result
-        assert "CONFLICTS" not in result
+        unexpected = [token for token in ("CONFLICTS", "DETACHED HEAD") if token in result]
+        assert not unexpected, f"Unexpected in context: {unexpected}"